@@ -1,9 +1,15 @@
-"""APK scanning utilities using androguard."""
+"""APK scanning utilities using androguard (and pyaxmlparser when possible)."""
 from __future__ import annotations
+import functools
+import gc
 import logging
 import os
 import hashlib
-from typing import Any, Dict, List, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import AbstractSet, Any, Dict, FrozenSet, List, Optional, Tuple
 
 # --- SMART IMPORT BLOCK (Handles both Old and New Androguard) ---
 try:
@@ -21,11 +27,37 @@ except ImportError:
         ANDROGUARD_IMPORT_ERROR = exc
 # -------------------------------------------------------------
 
+# pyaxmlparser only decodes the manifest and resources; it is used instead of
+# androguard whenever the signing certificate is not needed.
+try:
+    from pyaxmlparser import APK as ManifestAPK
+except ImportError:
+    ManifestAPK = None
+
+# Parsing an APK at least this large leaves enough cyclic garbage (resource
+# tables, certificate chains) that it is collected right away rather than at
+# the next automatic full collection.
+_GC_AFTER_BYTES = 32 * 1024 * 1024
+
+ALL_FIELDS: FrozenSet[str] = frozenset(
+    {"app_name", "package_name", "permissions", "icon_data", "certificate_hash"}
+)
+
 logger = logging.getLogger(__name__)
 
-def extract_apk_data(apk_path: str) -> Dict[str, Any]:
-    # Default empty result
-    result = {
+# Independent extractions (name, icon, certificate) of an already-loaded APK
+# run concurrently; zlib inflation and file reads release the GIL.
+_EXTRACTOR_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="apk-extract")
+
+# Parsed results for uploads, keyed by a digest of the APK contents so that
+# identical uploads hit the cache regardless of the temporary file name.
+_UPLOAD_CACHE_MAXSIZE = 256
+_upload_cache: "OrderedDict[Tuple[str, FrozenSet[str]], Dict[str, Any]]" = OrderedDict()
+_upload_cache_lock = threading.Lock()
+
+
+def _empty_result() -> Dict[str, Any]:
+    return {
         "app_name": None,
         "package_name": None,
         "permissions": [],
@@ -33,54 +65,238 @@ def extract_apk_data(apk_path: str) -> Dict[str, Any]:
         "certificate_hash": None,
     }
 
-    # 1. Check if Androguard loaded correctly
-    if ANDROGUARD_IMPORT_ERROR or APK is None:
+
+def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of a cached result that callers may freely mutate."""
+
+    copied = dict(result)
+    copied["permissions"] = list(result["permissions"])
+    return copied
+
+
+def _use_manifest_parser(fields: FrozenSet[str]) -> bool:
+    return ManifestAPK is not None and "certificate_hash" not in fields
+
+
+def extract_apk_data(
+    apk_path: str,
+    cache_key: Optional[str] = None,
+    fields: Optional[AbstractSet[str]] = None,
+) -> Dict[str, Any]:
+    """Extract metadata from an APK, reusing previously parsed results.
+
+    Results are cached by ``(path, size, mtime)``. When ``cache_key`` is
+    given (e.g. a digest of the uploaded bytes), results are cached on that
+    key instead, so re-uploads of the same APK skip parsing entirely.
+
+    ``fields`` restricts extraction to a subset of ``ALL_FIELDS``; the other
+    keys keep their empty defaults. Unless ``certificate_hash`` is requested,
+    the lighter pyaxmlparser is used instead of androguard when available.
+    """
+
+    requested = ALL_FIELDS if fields is None else frozenset(fields)
+    unknown = requested - ALL_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown APK fields: {', '.join(sorted(unknown))}")
+
+    # 1. Check that a parser for the requested fields loaded correctly
+    if not _use_manifest_parser(requested) and (ANDROGUARD_IMPORT_ERROR or APK is None):
         logger.error("Androguard load error. Please install: pip install androguard")
-        return result
+        return _empty_result()
+
+    if cache_key is not None:
+        with _upload_cache_lock:
+            cached = _upload_cache.get((cache_key, requested))
+            if cached is not None:
+                _upload_cache.move_to_end((cache_key, requested))
+                return _copy_result(cached)
 
     # 2. Check file existence
-    if not os.path.exists(apk_path):
-        return result
+    try:
+        st = os.stat(apk_path)
+    except OSError:
+        return _empty_result()
+
+    if cache_key is None:
+        result = _parse_apk_cached(
+            os.path.abspath(apk_path), st.st_size, st.st_mtime_ns, requested
+        )
+        return _copy_result(result)
+
+    result = _parse_apk(apk_path, requested)
+    with _upload_cache_lock:
+        _upload_cache[(cache_key, requested)] = result
+        _upload_cache.move_to_end((cache_key, requested))
+        while len(_upload_cache) > _UPLOAD_CACHE_MAXSIZE:
+            _upload_cache.popitem(last=False)
+    return _copy_result(result)
+
+
+def send_apk_data(conn: Connection, apk_path: str, cache_key: Optional[str] = None) -> None:
+    """Process entry point: send ``extract_apk_data``'s result over ``conn``.
+
+    Lets a parent process run each parse in its own child and kill it
+    without affecting other parses. If the child dies, the parent sees EOF.
+    """
 
     try:
-        # 3. Load APK
-        apk = APK(apk_path)
+        conn.send(extract_apk_data(apk_path, cache_key))
+    finally:
+        conn.close()
 
-        # 4. Extract Metadata safely
-        try: result["app_name"] = apk.get_app_name()
-        except: pass
 
-        try: result["package_name"] = apk.get_package()
-        except: pass
+@functools.lru_cache(maxsize=1024)
+def _cert_sha256(contents: bytes) -> str:
+    """SHA-256 fingerprint of a DER-encoded certificate, memoized per blob."""
 
-        try: 
-            perms = apk.get_permissions()
-            result["permissions"] = list(perms) if perms else []
-        except: pass
+    return hashlib.new("sha256", contents, usedforsecurity=False).hexdigest()
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_apk_cached(
+    apk_path: str, size: int, mtime_ns: int, fields: FrozenSet[str]
+) -> Dict[str, Any]:
+    # ``size`` and ``mtime_ns`` only participate in the cache key.
+    return _parse_apk(apk_path, fields)
+
+
+def _parse_apk(apk_path: str, fields: FrozenSet[str]) -> Dict[str, Any]:
+    if _use_manifest_parser(fields):
+        return _parse_manifest(apk_path, fields)
+    return _parse_with_androguard(apk_path, fields)
+
+
+def _extract_icon(apk: Any) -> Optional[bytes]:
+    icon_name = apk.get_app_icon()
+    if icon_name:
+        return apk.get_file(icon_name)
+    return None
 
-        # 5. Extract Icon
+
+def _extract_certificate_hash(apk: Any) -> Optional[str]:
+    # New & Old Version Compatible
+    certs = apk.get_certificates()
+    if not certs:
+        return None
+    cert = certs[0]
+    # Try getting SHA256 (works on new androguard)
+    sha = getattr(cert, "sha256_fingerprint", None) or getattr(cert, "sha256", None)
+
+    if sha:
+        # Clean up the format
+        return str(sha).replace(":", "").lower()
+    # Fallback for very old androguard
+    return _cert_sha256(bytes(cert.get_raw()))
+
+
+def _parse_manifest(apk_path: str, fields: FrozenSet[str]) -> Dict[str, Any]:
+    """Fast path: read name, package, permissions and icon via pyaxmlparser."""
+
+    result = _empty_result()
+
+    try:
+        apk = ManifestAPK(apk_path)
+
+        if "app_name" in fields:
+            try: result["app_name"] = apk.get_app_name()
+            except: pass
+
+        if "package_name" in fields:
+            try: result["package_name"] = apk.get_package()
+            except: pass
+
+        if "permissions" in fields:
+            try:
+                perms = apk.get_permissions()
+                result["permissions"] = list(perms) if perms else []
+            except: pass
+
+        if "icon_data" in fields:
+            try: result["icon_data"] = _extract_icon(apk)
+            except: pass
+
+    except Exception as e:
+        logger.error(f"Critical Error parsing APK manifest: {e}")
+
+    return result
+
+
+def _prefetch(apk_path: str) -> None:
+    """Ask the kernel to start reading the whole APK into the page cache.
+
+    androguard reads the entire file into memory before parsing, so the
+    whole range is requested up front. WILLNEED is used
+    rather than SEQUENTIAL because the latter only applies to the file
+    description it is issued on, not to androguard's own open().
+    """
+
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(apk_path, os.O_RDONLY)
         try:
-            icon_name = apk.get_app_icon()
-            if icon_name:
-                result["icon_data"] = apk.get_file(icon_name)
-        except: pass
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def _parse_with_androguard(apk_path: str, fields: FrozenSet[str]) -> Dict[str, Any]:
+    # The APK object only lives in _androguard_extract's frame, so it is
+    # released as soon as the small result dict is returned.
+    result = _androguard_extract(apk_path, fields)
+
+    try:
+        if os.path.getsize(apk_path) >= _GC_AFTER_BYTES:
+            gc.collect()
+    except OSError:
+        pass
+
+    return result
+
+
+def _androguard_extract(apk_path: str, fields: FrozenSet[str]) -> Dict[str, Any]:
+    result = _empty_result()
 
-        # 6. Extract Certificate (New & Old Version Compatible)
+    try:
+        # 3. Load APK
+        _prefetch(apk_path)
+        apk = APK(apk_path)
+
+        # Build and analyse the resource table up front. ARSCParser analyses
+        # lazily and flags itself as analysed before its tables are filled,
+        # so letting the name and icon threads trigger it would race and
+        # quietly resolve nothing. Afterwards both lookups only read it; zip
+        # member reads are serialized by zipfile itself.
         try:
-            certs = apk.get_certificates()
-            if certs:
-                cert = certs[0]
-                # Try getting SHA256 (works on new androguard)
-                sha = getattr(cert, "sha256_fingerprint", None) or getattr(cert, "sha256", None)
-                
-                if sha:
-                    # Clean up the format
-                    result["certificate_hash"] = str(sha).replace(":", "").lower()
-                else:
-                    # Fallback for very old androguard
-                    result["certificate_hash"] = hashlib.sha256(cert.get_raw()).hexdigest()
+            res = apk.get_android_resources()
+            if res is not None: res._analyse()
         except: pass
 
+        # 4-6. Name, icon and certificate are independent; run them in parallel.
+        futures = {}
+        if "app_name" in fields:
+            futures["app_name"] = _EXTRACTOR_POOL.submit(apk.get_app_name)
+        if "icon_data" in fields:
+            futures["icon_data"] = _EXTRACTOR_POOL.submit(_extract_icon, apk)
+        if "certificate_hash" in fields:
+            futures["certificate_hash"] = _EXTRACTOR_POOL.submit(_extract_certificate_hash, apk)
+
+        if "package_name" in fields:
+            try: result["package_name"] = apk.get_package()
+            except: pass
+
+        if "permissions" in fields:
+            try:
+                perms = apk.get_permissions()
+                result["permissions"] = list(perms) if perms else []
+            except: pass
+
+        for field, future in futures.items():
+            try: result[field] = future.result()
+            except: pass
+
     except Exception as e:
         logger.error(f"Critical Error parsing APK: {e}")
 
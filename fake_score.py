@@ -6,7 +6,14 @@ This module defines helpers that combine individual risk signals
 
 from __future__ import annotations
 
-from typing import Iterable
+import math
+from typing import Iterable, List
+
+import numpy as np
+
+# Inputs up to this size are averaged in plain Python; NumPy's per-call
+# overhead only pays off for larger batches of risk signals.
+_SMALL_INPUT_SIZE = 4
 
 
 def calculate_fake_score(risks: Iterable[float]) -> float:
@@ -21,33 +28,52 @@ def calculate_fake_score(risks: Iterable[float]) -> float:
     Returns
     -------
     float
-        The arithmetic mean of all provided risks, or ``0.0`` if ``risks``
-        is empty. The result is clamped to the range [0.0, 100.0].
+        The arithmetic mean of all finite, numeric risks, or ``0.0`` if there
+        are none. The result is clamped to the range [0.0, 100.0].
     """
 
-    total = 0.0
-    count = 0
-    for value in risks:
+    values = risks if isinstance(risks, (list, tuple)) else list(risks)
+
+    if len(values) <= _SMALL_INPUT_SIZE:
+        avg = _average_small(values)
+    else:
+        avg = _average_large(values)
+
+    # Clamp to a sensible range.
+    if avg < 0.0:
+        return 0.0
+    if avg > 100.0:
+        return 100.0
+    return avg
+
+
+def _average_small(values: List[object]) -> float:
+    finite = []
+    for value in values:
         # Ignore non-finite or clearly invalid inputs.
         try:
             v = float(value)
         except (TypeError, ValueError):
             continue
 
-        if v != v:  # NaN check
+        if not math.isfinite(v):
             continue
 
-        total += v
-        count += 1
+        finite.append(v)
 
-    if count == 0:
+    if not finite:
         return 0.0
+    return math.fsum(finite) / len(finite)
 
-    avg = total / count
 
-    # Clamp to a sensible range.
-    if avg < 0.0:
+def _average_large(values: List[object]) -> float:
+    try:
+        arr = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Mixed/invalid inputs: filter them element-wise instead.
+        return _average_small(values)
+
+    arr = arr[np.isfinite(arr)]
+    if arr.size == 0:
         return 0.0
-    if avg > 100.0:
-        return 100.0
-    return avg
+    return float(arr.mean())
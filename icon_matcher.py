@@ -1,16 +1,25 @@
 """Icon similarity engine using perceptual hashing.
 
-This module compares app icons using the `imagehash` library and Pillow.
+This module compares app icons using perceptual hashes compatible with the
+`imagehash` library, computed with Pillow and NumPy.
 It exposes `calculate_icon_similarity`, which returns a similarity
-percentage (0-100), where 100 means identical perceptual hashes.
+percentage (0-100), where 100 means identical perceptual hashes, and
+`calculate_icon_similarity_batch` for matching one icon against many
+reference hashes at once.
 """
 
 from __future__ import annotations
 
+import functools
+import hashlib
 import logging
+import os
+import threading
+from collections import OrderedDict
 from io import BytesIO
-from typing import Optional
+from typing import Iterable, Optional
 
+import numpy as np
 from PIL import Image
 
 try:  # Import imagehash with a clear failure mode if missing.
@@ -43,6 +52,77 @@ def _load_image_from_path(path: str) -> Image.Image:
     return img.convert("RGB")
 
 
+# phash parameters matching ``imagehash.phash`` defaults.
+_PHASH_IMG_SIZE = 32
+_PHASH_HASH_SIZE = 8
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Unnormalized DCT-II basis, the same transform as ``scipy.fftpack.dct``."""
+
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    return 2.0 * np.cos(np.pi * k * (2 * i + 1) / (2 * n))
+
+
+# Only the low-frequency rows are kept: ``_DCT_LOW @ X @ _DCT_LOW.T`` is the
+# top-left 8x8 block of imagehash's row-then-column DCT of a 32x32 image.
+_DCT_LOW = _dct_matrix(_PHASH_IMG_SIZE)[:_PHASH_HASH_SIZE]
+
+# Relative magnitude below which a DCT coefficient is treated as zero.
+_PHASH_ZERO_TOL = 1e-9
+
+
+def _phash(image: Image.Image) -> "imagehash.ImageHash":
+    """Bit-compatible ``imagehash.phash`` specialized to a 32x32 input.
+
+    Two small matrix products replace scipy's pair of full DCT passes.
+    """
+
+    small = image.convert("L").resize(
+        (_PHASH_IMG_SIZE, _PHASH_IMG_SIZE), Image.Resampling.LANCZOS
+    )
+    pixels = np.asarray(small, dtype=np.float64)
+    low = _DCT_LOW @ pixels @ _DCT_LOW.T
+    # Coefficients that are exactly zero in scipy's DCT (flat images, flat
+    # rows or columns) come out of the matmul as rounding noise; snap them
+    # back so the median comparison doesn't hash that noise.
+    low[np.abs(low) < _PHASH_ZERO_TOL * np.abs(low).max()] = 0.0
+    return imagehash.ImageHash(low > np.median(low))
+
+
+# Perceptual hashes of candidate icons, keyed by a digest of the icon bytes so
+# that repeated identical APKs skip decoding and hashing.
+_CANDIDATE_CACHE_MAXSIZE = 1024
+_candidate_cache: "OrderedDict[bytes, imagehash.ImageHash]" = OrderedDict()
+_candidate_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=128)
+def _reference_phash(path: str, mtime_ns: int) -> "imagehash.ImageHash":
+    """Perceptual hash of a reference image, cached until the file changes."""
+
+    return _phash(_load_image_from_path(path))
+
+
+def _candidate_phash(icon_bytes: bytes) -> "imagehash.ImageHash":
+    """Perceptual hash of candidate icon bytes, cached by content digest."""
+
+    key = hashlib.blake2b(icon_bytes, digest_size=16, usedforsecurity=False).digest()
+    with _candidate_cache_lock:
+        cached = _candidate_cache.get(key)
+        if cached is not None:
+            _candidate_cache.move_to_end(key)
+            return cached
+
+    hash_candidate = _phash(_load_image_from_bytes(icon_bytes))
+    with _candidate_cache_lock:
+        _candidate_cache[key] = hash_candidate
+        while len(_candidate_cache) > _CANDIDATE_CACHE_MAXSIZE:
+            _candidate_cache.popitem(last=False)
+    return hash_candidate
+
+
 def calculate_icon_similarity(icon_bytes: Optional[bytes], reference_image_path: str) -> float:
     """Compare an in-memory icon image against a reference image on disk.
 
@@ -61,7 +141,9 @@ def calculate_icon_similarity(icon_bytes: Optional[bytes], reference_image_path:
 
     Notes
     -----
-    - Uses `imagehash.phash` for perceptual hashing.
+    - Uses perceptual hashing equivalent to `imagehash.phash`. Reference hashes are
+      cached per path and modification time; candidate hashes are cached by
+      a digest of the icon bytes.
     - If loading or hashing fails for any reason, this function logs the
       error and returns 0.0 rather than raising.
     """
@@ -77,11 +159,9 @@ def calculate_icon_similarity(icon_bytes: Optional[bytes], reference_image_path:
         ) from IMAGEHASH_IMPORT_ERROR
 
     try:
-        candidate_img = _load_image_from_bytes(icon_bytes)
-        reference_img = _load_image_from_path(reference_image_path)
-
-        hash_candidate = imagehash.phash(candidate_img)
-        hash_reference = imagehash.phash(reference_img)
+        mtime_ns = os.stat(reference_image_path).st_mtime_ns
+        hash_reference = _reference_phash(reference_image_path, mtime_ns)
+        hash_candidate = _candidate_phash(icon_bytes)
 
         # Hamming distance between the hashes; 0 means identical.
         diff = hash_candidate - hash_reference
@@ -96,3 +176,144 @@ def calculate_icon_similarity(icon_bytes: Optional[bytes], reference_image_path:
             "Failed to compute icon similarity for reference '%s'", reference_image_path
         )
         return 0.0
+
+
+def _pack_hash(image_hash: "imagehash.ImageHash") -> np.ndarray:
+    """Pack a 64-bit perceptual hash into 8 ``uint8`` bytes."""
+
+    return np.packbits(image_hash.hash)
+
+
+def load_reference_hashes(reference_image_paths: Iterable[str]) -> np.ndarray:
+    """Hash reference images into an ``(N, 8)`` ``uint8`` matrix.
+
+    The result is intended to be built once and passed to
+    `calculate_icon_similarity_batch` for every candidate icon.
+    """
+
+    if IMAGEHASH_IMPORT_ERROR is not None or imagehash is None:  # pragma: no cover
+        raise RuntimeError(
+            "imagehash is not installed. Install it with 'pip install imagehash' "
+            "to enable icon similarity scoring."
+        ) from IMAGEHASH_IMPORT_ERROR
+
+    rows = []
+    for path in reference_image_paths:
+        mtime_ns = os.stat(path).st_mtime_ns
+        rows.append(_pack_hash(_reference_phash(path, mtime_ns)))
+
+    if not rows:
+        return np.empty((0, 8), dtype=np.uint8)
+    return np.stack(rows)
+
+
+# Below this many references the NumPy path is cheaper than dispatching to
+# numba's thread pool.
+_NUMBA_MIN_REFS = 1024
+
+# numba is optional; without it batch matching stays in plain NumPy. It is
+# only imported, and the kernel compiled, on the first batch large enough to
+# use it, so processes that never match large reference sets don't pay for
+# LLVM. ``prange`` is swapped for numba's before the kernel is compiled.
+prange = range
+_hamming_batch = None
+_numba_loaded = False
+_numba_lock = threading.Lock()
+
+# SWAR popcount constants, typed as uint64 so numba keeps the arithmetic
+# unsigned; LLVM folds the sequence into a single POPCNT.
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+_S1, _S2, _S4, _S56 = np.uint64(1), np.uint64(2), np.uint64(4), np.uint64(56)
+
+
+def _hamming_batch_kernel(refs: np.ndarray, cand: np.uint64) -> np.ndarray:
+    """Hamming distance between ``cand`` and every 64-bit hash in ``refs``."""
+
+    out = np.empty(refs.shape[0], dtype=np.uint8)
+    for i in prange(refs.shape[0]):
+        x = refs[i] ^ cand
+        x = x - ((x >> _S1) & _M1)
+        x = (x & _M2) + ((x >> _S2) & _M2)
+        x = (x + (x >> _S4)) & _M4
+        out[i] = (x * _H01) >> _S56
+    return out
+
+
+def _get_hamming_batch():
+    """Return the compiled numba kernel, or None if numba is unavailable."""
+
+    global _hamming_batch, _numba_loaded, prange
+    with _numba_lock:
+        if not _numba_loaded:
+            _numba_loaded = True
+            try:
+                import numba
+            except ImportError:  # pragma: no cover - optional accelerator
+                return None
+            prange = numba.prange
+            try:
+                _hamming_batch = numba.njit(parallel=True, cache=True)(_hamming_batch_kernel)
+            except RuntimeError:  # no writable cache directory, e.g. read-only install
+                _hamming_batch = numba.njit(parallel=True)(_hamming_batch_kernel)
+    return _hamming_batch
+
+
+def _hamming_distances(reference_hashes: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """Hamming distance of a packed candidate hash to each packed reference."""
+
+    if reference_hashes.shape[0] >= _NUMBA_MIN_REFS:
+        hamming_batch = _get_hamming_batch()
+        if hamming_batch is not None:
+            refs = np.ascontiguousarray(reference_hashes).view(np.uint64).reshape(-1)
+            return hamming_batch(refs, candidate.view(np.uint64)[0])
+    return np.unpackbits(reference_hashes ^ candidate, axis=1).sum(axis=1)
+
+
+def calculate_icon_similarity_batch(
+    icon_bytes: Optional[bytes], reference_hashes: np.ndarray
+) -> np.ndarray:
+    """Compare an in-memory icon against many packed reference hashes.
+
+    Parameters
+    ----------
+    icon_bytes:
+        Raw bytes of the candidate icon (e.g., from an APK).
+    reference_hashes:
+        ``(N, 8)`` ``uint8`` matrix as returned by `load_reference_hashes`.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``(N,)`` array of similarity percentages in [0.0, 100.0], one per
+        reference. All zeros if the icon is missing or cannot be hashed.
+
+    Notes
+    -----
+    Large reference sets use a parallel numba popcount kernel when numba is
+    installed.
+    """
+
+    n_refs = reference_hashes.shape[0]
+    if icon_bytes is None:
+        logger.warning("No icon bytes provided; returning similarity=0.0")
+        return np.zeros(n_refs, dtype=np.float64)
+
+    if IMAGEHASH_IMPORT_ERROR is not None or imagehash is None:  # pragma: no cover
+        raise RuntimeError(
+            "imagehash is not installed. Install it with 'pip install imagehash' "
+            "to enable icon similarity scoring."
+        ) from IMAGEHASH_IMPORT_ERROR
+
+    try:
+        candidate = _pack_hash(_candidate_phash(icon_bytes))
+    except Exception:  # pragma: no cover - robustness for unexpected image issues
+        logger.exception("Failed to hash candidate icon for batch similarity")
+        return np.zeros(n_refs, dtype=np.float64)
+
+    # Hamming distance of every reference in a single pass.
+    diff = _hamming_distances(reference_hashes, candidate)
+    similarity = 100.0 * (1.0 - diff / 64.0)
+    return np.round(similarity, 2)
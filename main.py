@@ -7,28 +7,367 @@ reference information and returns extracted metadata plus a simple
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import errno
+import hashlib
+import logging
+import multiprocessing
 import os
+import shutil
+import sys
 import tempfile
-from typing import Any, Dict, Optional
+from typing import IO, Any, Dict, Optional, Tuple
 
-from fastapi import FastAPI, File, HTTPException, UploadFile, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, File, HTTPException, Path, UploadFile, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
 
-from apk_scanner import extract_apk_data
+from apk_scanner import send_apk_data
 from fake_score import calculate_fake_score
 from icon_matcher import calculate_icon_similarity
 from text_similarity import calculate_text_risk
 
-app = FastAPI(title="BrandGuard Fake App Detector", version="0.1.0")
+try:  # diskcache is optional; without it only the in-process cache is used.
+    import diskcache
+except ImportError:  # pragma: no cover - environment/config error
+    diskcache = None  # type: ignore[assignment]
+
+try:  # orjson is optional; it serializes JSON responses faster than `json`.
+    import orjson  # noqa: F401
+except ImportError:  # pragma: no cover - environment/config error
+    DefaultJSONResponse = JSONResponse
+else:
+    DefaultJSONResponse = ORJSONResponse
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI(
+    title="BrandGuard Fake App Detector",
+    version="0.1.0",
+    default_response_class=DefaultJSONResponse,
+)
+
+# Uploads are copied to disk in chunks of this size rather than buffered whole.
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Parsed APK metadata is persisted across restarts, keyed by upload digest.
+APK_CACHE_DIR = os.environ.get("BRANDGUARD_APK_CACHE_DIR", "/var/cache/brandguard/apk")
+APK_CACHE_TTL = 24 * 60 * 60
+
+# Each APK is parsed in its own process: a crashing, hanging or leaking parse
+# only takes down its own process, and concurrent uploads are parsed without
+# sharing the GIL. Where available, the processes are forked from a
+# forkserver that has apk_scanner preloaded, so a parse doesn't pay for the
+# androguard import (and the server process, which runs threads, is never
+# forked itself).
+APK_PARSE_TIMEOUT = 30.0
+_PARSE_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+_parse_context = multiprocessing.get_context(_PARSE_START_METHOD)
+if _PARSE_START_METHOD == "forkserver":
+    _parse_context.set_forkserver_preload(["apk_scanner"])
+_parse_slots = asyncio.Semaphore(os.cpu_count() or 1)
+
+# The APK copy handed to the parser goes to tmpfs when available, so it never
+# touches persistent storage. This trades disk I/O for RAM: each in-flight
+# request holds one copy of its APK in tmpfs, on top of the O(1 MiB) buffer of
+# the streamed copy. Other temp files (Starlette's upload spool, generated
+# PDFs) stay in the regular temp directory. tmpfs is only used when it had at
+# least TMPFS_MIN_FREE_BYTES free at startup and still has room for the
+# upload; a copy that runs out of space there anyway is retried in the
+# regular temp directory.
+TMPFS_TEMPDIR = "/dev/shm/brandguard"
+TMPFS_MIN_FREE_BYTES = 1 << 30
+
+# Linux's sendfile accepts any file as the destination; macOS and the BSDs
+# require a socket, so the kernel-side copy is Linux-only.
+_SENDFILE_SUPPORTED = hasattr(os, "sendfile") and sys.platform.startswith("linux")
 
 # Template renderer and static file mounting
 templates = Jinja2Templates(directory="templates")
+# Templates don't change while the service runs: skip the per-render stat and
+# persist compiled bytecode so restarts don't re-parse them. The default cache
+# directory is a private, per-user directory under the temp dir.
+templates.env.auto_reload = False
+templates.env.bytecode_cache = FileSystemBytecodeCache()
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
+def _tmpfs_tempdir() -> Optional[str]:
+    """Return a private tmpfs directory for APK copies, or None if unavailable."""
+
+    if not os.path.isdir("/dev/shm"):
+        return None
+    try:
+        # e.g. Docker's default /dev/shm is only 64 MiB.
+        free = shutil.disk_usage("/dev/shm").free
+        if free < TMPFS_MIN_FREE_BYTES:
+            logger.warning(
+                "Not using '%s' for temp files: only %d MiB free.", TMPFS_TEMPDIR, free >> 20
+            )
+            return None
+        os.makedirs(TMPFS_TEMPDIR, mode=0o700, exist_ok=True)
+        # /dev/shm is world-writable; only use a directory we own.
+        if os.stat(TMPFS_TEMPDIR).st_uid != os.getuid():
+            logger.warning("Not using '%s' for temp files: owned by another user.", TMPFS_TEMPDIR)
+            return None
+    except OSError as exc:
+        logger.warning("Not using '%s' for temp files: %s", TMPFS_TEMPDIR, exc)
+        return None
+    return TMPFS_TEMPDIR
+
+
+_apk_tempdir = _tmpfs_tempdir()
+
+
+def _open_apk_cache() -> Optional["diskcache.Cache"]:
+    """Open the on-disk APK metadata cache, or return None if unavailable."""
+
+    if diskcache is None:
+        logger.warning("diskcache is not installed; APK results will not persist.")
+        return None
+    try:
+        return diskcache.Cache(APK_CACHE_DIR)
+    except Exception as exc:  # e.g. permission denied on the cache directory
+        logger.warning("APK cache disabled; cannot open '%s': %s", APK_CACHE_DIR, exc)
+        return None
+
+
+apk_cache = _open_apk_cache()
+
+
+def _load_cached_metadata(cache_key: str) -> Optional[Dict[str, Any]]:
+    """Fetch previously extracted APK metadata from the disk cache.
+
+    An entry whose icon has already been evicted or expired counts as a
+    miss, so the APK is parsed again rather than reported without an icon.
+    """
+
+    if apk_cache is None:
+        return None
+    try:
+        metadata = apk_cache.get(cache_key)
+        if metadata is None:
+            return None
+        metadata = dict(metadata)
+        icon_bytes = None
+        if metadata.pop("has_icon", False):
+            icon_bytes = apk_cache.get(_icon_cache_key(cache_key))
+            if icon_bytes is None:
+                return None
+        metadata["icon_data"] = icon_bytes
+        return metadata
+    except Exception:  # pragma: no cover - cache is best-effort
+        logger.exception("Failed to read APK cache entry '%s'", cache_key)
+        return None
+
+
+def _store_cached_metadata(cache_key: str, metadata: Dict[str, Any]) -> bool:
+    """Persist extracted APK metadata; the icon is stored as raw bytes.
+
+    Returns whether the entry was written.
+    """
+
+    # Don't persist failed parses (e.g. androguard missing or a corrupt APK).
+    if apk_cache is None or not metadata.get("package_name"):
+        return False
+    try:
+        fields = {k: v for k, v in metadata.items() if k != "icon_data"}
+        icon_bytes = metadata.get("icon_data")
+        fields["has_icon"] = icon_bytes is not None
+        if icon_bytes is not None:
+            apk_cache.set(_icon_cache_key(cache_key), bytes(icon_bytes), expire=APK_CACHE_TTL)
+        apk_cache.set(cache_key, fields, expire=APK_CACHE_TTL)
+        return True
+    except Exception:  # pragma: no cover - cache is best-effort
+        logger.exception("Failed to write APK cache entry '%s'", cache_key)
+        return False
+
+
+def _is_spooled_to_disk(upload: UploadFile) -> bool:
+    """Whether the upload's spooled temp file has been rolled over to disk."""
+
+    # A SpooledTemporaryFile only has a name (or fd number) once it is backed
+    # by a real file. Probing with fileno() instead would force a rollover.
+    return _SENDFILE_SUPPORTED and getattr(upload.file, "name", None) is not None
+
+
+def _icon_cache_key(cache_key: str) -> str:
+    return f"{cache_key}:icon"
+
+
+def _load_cached_icon(cache_key: str) -> Optional[bytes]:
+    """Fetch a previously extracted icon from the disk cache."""
+
+    if apk_cache is None:
+        return None
+    try:
+        return apk_cache.get(_icon_cache_key(cache_key))
+    except Exception:  # pragma: no cover - cache is best-effort
+        logger.exception("Failed to read APK cache entry '%s'", cache_key)
+        return None
+
+
+def _icon_media_type(icon_bytes: bytes) -> str:
+    """Guess an icon's media type from its magic bytes."""
+
+    if icon_bytes.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if icon_bytes[:4] == b"RIFF" and icon_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    if icon_bytes.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    return "application/octet-stream"
+
+
+def _run_parse_process(apk_path: str, cache_key: str) -> Dict[str, Any]:
+    """Run `extract_apk_data` in a new process and wait for its result.
+
+    Raises TimeoutError if no result arrives within APK_PARSE_TIMEOUT and
+    EOFError if the process dies without sending one. Either way the
+    process is killed; other parses are unaffected.
+    """
+
+    recv_conn, send_conn = _parse_context.Pipe(duplex=False)
+    process = _parse_context.Process(
+        target=send_apk_data, args=(send_conn, apk_path, cache_key), daemon=True
+    )
+    try:
+        process.start()
+        send_conn.close()
+        if not recv_conn.poll(APK_PARSE_TIMEOUT):
+            raise TimeoutError
+        return recv_conn.recv()
+    finally:
+        send_conn.close()
+        recv_conn.close()
+        if process.pid is not None:
+            # The result (if any) has been received; don't wait on teardown.
+            process.kill()
+            process.join()
+            process.close()
+
+
+async def _extract_apk_data_isolated(apk_path: str, cache_key: str) -> Dict[str, Any]:
+    """Parse an APK in its own process with a timeout."""
+
+    async with _parse_slots:
+        try:
+            return await run_in_threadpool(_run_parse_process, apk_path, cache_key)
+        except TimeoutError:
+            logger.error("APK parse timed out; killed its parser process.")
+            raise HTTPException(
+                status_code=504, detail=f"APK parsing timed out after {APK_PARSE_TIMEOUT:.0f}s."
+            )
+        except EOFError:
+            logger.error("APK parser process died without a result.")
+            raise HTTPException(status_code=422, detail="Failed to parse APK: the parser crashed.")
+
+
+def _upload_hasher() -> Any:
+    """Hasher for upload cache keys.
+
+    Keys only need collision resistance, not a user-visible fingerprint, so
+    the faster BLAKE2b with a 128-bit digest is used instead of SHA-256.
+    """
+
+    return hashlib.blake2b(digest_size=16, usedforsecurity=False)
+
+
+def _sendfile_upload(src: IO[bytes], dst: IO[bytes]) -> Tuple[int, str]:
+    """Copy a disk-backed upload into ``dst`` inside the kernel.
+
+    Returns the number of bytes copied and the upload's cache digest. The
+    digest still needs one read of the source, but the copy itself avoids
+    moving the APK through user space.
+    """
+
+    in_fd = src.fileno()
+    out_fd = dst.fileno()
+    size = os.fstat(in_fd).st_size
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+        if not sent:
+            break
+        offset += sent
+
+    hasher = _upload_hasher()
+    src.seek(0)
+    for chunk in iter(lambda: src.read(UPLOAD_CHUNK_SIZE), b""):
+        hasher.update(chunk)
+    return offset, hasher.hexdigest()
+
+
+async def _stream_upload(upload: UploadFile, dst: IO[bytes]) -> Tuple[int, str]:
+    """Copy an upload into ``dst`` chunk by chunk, hashing it on the way."""
+
+    hasher = _upload_hasher()
+    total_size = 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        hasher.update(chunk)
+        dst.write(chunk)
+        total_size += len(chunk)
+    return total_size, hasher.hexdigest()
+
+
+async def _copy_upload(upload: UploadFile, tempdir: Optional[str]) -> Tuple[str, int, str]:
+    """Copy an upload into a new temp file in ``tempdir``.
+
+    Returns the temp file path, the number of bytes copied and the upload's
+    cache digest. The temp file is removed if the copy fails.
+    """
+
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".apk", dir=tempdir)
+    try:
+        with tmp:
+            if _is_spooled_to_disk(upload):
+                total_size, cache_key = await run_in_threadpool(_sendfile_upload, upload.file, tmp)
+            else:
+                total_size, cache_key = await _stream_upload(upload, tmp)
+    except BaseException:
+        try:
+            os.remove(tmp.name)
+        except OSError:
+            pass
+        raise
+    return tmp.name, total_size, cache_key
+
+
+def _has_tmpfs_room(upload: UploadFile) -> bool:
+    """Whether the tmpfs temp dir currently has room for ``upload``."""
+
+    if _apk_tempdir is None:
+        return False
+    try:
+        return shutil.disk_usage(_apk_tempdir).free > (upload.size or 0)
+    except OSError:
+        return False
+
+
+async def _persist_upload(upload: UploadFile) -> Tuple[str, int, str]:
+    """Copy an upload to tmpfs, falling back to the regular temp dir if full."""
+
+    if not _has_tmpfs_room(upload):
+        return await _copy_upload(upload, None)
+    try:
+        return await _copy_upload(upload, _apk_tempdir)
+    except OSError as exc:
+        if exc.errno != errno.ENOSPC:
+            raise
+        logger.warning("'%s' is full; copying upload to the regular temp dir.", _apk_tempdir)
+    await upload.seek(0)
+    return await _copy_upload(upload, None)
+
+
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request) -> HTMLResponse:
     """Serve the main HTML interface."""
@@ -41,6 +380,7 @@ async def analyze_apk(
     apk_file: UploadFile = File(..., description="APK file to analyze"),
     real_name: str = "",
     reference_icon_path: Optional[str] = None,
+    include_icon: bool = False,
 ) -> JSONResponse:
     """Analyze an uploaded APK and return metadata and a fake score.
 
@@ -55,6 +395,10 @@ async def analyze_apk(
         Filesystem path to the reference icon image corresponding to the
         legitimate app. If provided and the APK contains an icon, icon-based
         similarity is computed.
+    include_icon:
+        Whether to inline the extracted icon as base64 even when it can be
+        fetched from ``icon_url``. Icons without a cached URL are always
+        inlined.
 
     Returns
     -------
@@ -63,22 +407,27 @@ async def analyze_apk(
         and the aggregate fake score.
     """
 
-    # Persist the uploaded APK to a temporary file so androguard can read it.
-    try:
-        contents = await apk_file.read()
-    except Exception as exc:  # pragma: no cover - I/O issues
-        raise HTTPException(status_code=400, detail=f"Failed to read uploaded APK: {exc}")
-
-    if not contents:
-        raise HTTPException(status_code=400, detail="Uploaded APK file is empty.")
-
+    # Copy the uploaded APK to a temporary file so androguard can read it,
+    # hashing it on the way so identical uploads share a parse result
+    # regardless of the temp file name.
     tmp_path = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".apk") as tmp:
-            tmp.write(contents)
-            tmp_path = tmp.name
+        try:
+            tmp_path, total_size, cache_key = await _persist_upload(apk_file)
+        except Exception as exc:  # pragma: no cover - I/O issues
+            raise HTTPException(
+                status_code=400, detail=f"Failed to read uploaded APK: {exc}"
+            )
 
-        metadata: Dict[str, Any] = extract_apk_data(tmp_path)
+        if total_size == 0:
+            raise HTTPException(status_code=400, detail="Uploaded APK file is empty.")
+
+        # diskcache does blocking SQLite and file I/O; keep it off the loop.
+        metadata = await run_in_threadpool(_load_cached_metadata, cache_key)
+        cached = metadata is not None
+        if metadata is None:
+            metadata = await _extract_apk_data_isolated(tmp_path, cache_key)
+            cached = await run_in_threadpool(_store_cached_metadata, cache_key, metadata)
     finally:
         if tmp_path and os.path.exists(tmp_path):
             try:
@@ -96,7 +445,7 @@ async def analyze_apk(
     if real_name:
         try:
             text_risk = float(calculate_text_risk(app_name, real_name))
-        except RuntimeError as exc:  # thefuzz not installed
+        except RuntimeError as exc:  # rapidfuzz/thefuzz not installed
             raise HTTPException(status_code=500, detail=str(exc))
 
     # Icon-based risk (0-100) based on phash similarity.
@@ -112,12 +461,16 @@ async def analyze_apk(
     # Aggregate fake score as the simple average of available risks.
     fake_score = calculate_fake_score([text_risk, icon_risk])
 
-    # Prepare JSON-safe metadata (bytes must be encoded).
-    icon_b64: Optional[str]
-    if icon_bytes is not None:
+    # Prepare JSON-safe metadata (bytes must be encoded). The icon is served
+    # from `/icon/{cache_key}` when cached; it is only inlined as base64 when
+    # the client asks for it or no icon URL can be produced.
+    icon_url: Optional[str] = None
+    if icon_bytes is not None and cached:
+        icon_url = str(app.url_path_for("get_icon", cache_key=cache_key))
+
+    icon_b64: Optional[str] = None
+    if icon_bytes is not None and (include_icon or icon_url is None):
         icon_b64 = base64.b64encode(icon_bytes).decode("ascii")
-    else:
-        icon_b64 = None
 
     response_payload = {
         "metadata": {
@@ -126,6 +479,7 @@ async def analyze_apk(
             "permissions": metadata.get("permissions", []),
             "certificate_hash": metadata.get("certificate_hash"),
             "icon_data_base64": icon_b64,
+            "icon_url": icon_url,
         },
         "risks": {
             "text_risk": text_risk,
@@ -134,7 +488,20 @@ async def analyze_apk(
         "fake_score": fake_score,
     }
 
-    return JSONResponse(content=response_payload)
+    return DefaultJSONResponse(content=response_payload)
+
+
+@app.get("/icon/{cache_key}")
+async def get_icon(
+    cache_key: str = Path(..., pattern="^[0-9a-f]{32}$", description="Upload cache key"),
+) -> Response:
+    """Serve the raw icon extracted from a previously analyzed APK."""
+
+    icon_bytes = await run_in_threadpool(_load_cached_icon, cache_key)
+    if icon_bytes is None:
+        raise HTTPException(status_code=404, detail="Icon not found.")
+
+    return Response(content=icon_bytes, media_type=_icon_media_type(icon_bytes))
 
 
 @app.get("/health")
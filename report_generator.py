@@ -6,28 +6,94 @@ letter addressed to the Google Play Legal Team.
 
 from __future__ import annotations
 
+import copy
 import datetime as _dt
+import functools
 import os
-import textwrap
 from typing import Any, Dict
+from xml.sax.saxutils import escape
 
 try:  # Import reportlab with a clear failure mode if missing.
     from reportlab.lib.pagesizes import LETTER
-    from reportlab.pdfgen import canvas
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
 except ImportError as exc:  # pragma: no cover - environment/config error
     LETTER = None  # type: ignore[assignment]
-    canvas = None  # type: ignore[assignment]
+    Paragraph = None  # type: ignore[assignment]
     REPORTLAB_IMPORT_ERROR = exc
 else:
     REPORTLAB_IMPORT_ERROR = None
 
 import tempfile
 
+_FONT_SIZE = 11
+_LEADING = _FONT_SIZE * 1.2
+
+
+# Fixed boilerplate of the letter; everything else depends on the APK.
+_RECIPIENT_LINES = (
+    "Google Play Legal Team",
+    "Google LLC",
+    "1600 Amphitheatre Parkway",
+    "Mountain View, CA 94043",
+)
+_SUBJECT = "Subject: Takedown Request for Infringing Application"
+_SALUTATION = "To the Google Play Legal Team:"
+
+_REQUEST_PARAGRAPH = (
+    "In light of this evidence, we respectfully request that Google Play "
+    "review this application and take appropriate enforcement action, "
+    "including removal from the store if your policies deem it to be "
+    "infringing or misleading. We believe prompt action is necessary to "
+    "protect users from potential confusion, fraud, or abuse."
+)
+
+_EVIDENCE_PARAGRAPH = (
+    "For your reference, a subset of the technical indicators supporting this "
+    "request includes the following:"
+)
+
+_CLOSING = (
+    "Thank you for your attention to this matter and for your ongoing work "
+    "to keep the Google Play ecosystem safe for users and rights holders. "
+    "If you require any additional information or supporting documentation, "
+    "please do not hesitate to contact us."
+)
+
+_SIGN_OFF = ("Sincerely,", "BrandGuard Enforcement Team")
+
+
+@functools.lru_cache(maxsize=1)
+def _body_style() -> "ParagraphStyle":
+    """Letter body style: 11pt Helvetica with no extra paragraph spacing."""
+
+    return ParagraphStyle(
+        "TakedownBody",
+        parent=getSampleStyleSheet()["BodyText"],
+        fontName="Helvetica",
+        fontSize=_FONT_SIZE,
+        leading=_LEADING,
+        spaceBefore=0,
+        spaceAfter=0,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _bullet_style() -> "ParagraphStyle":
+    return ParagraphStyle("TakedownBullet", parent=_body_style(), leftIndent=12, bulletIndent=0)
+
 
-def _wrap_paragraph(text: str, width: int = 88) -> list[str]:
-    """Simple word-wrapping helper for PDF text objects."""
+@functools.lru_cache(maxsize=32)
+def _parsed_static_paragraph(text: str) -> "Paragraph":
+    """Parse a boilerplate paragraph once per process."""
 
-    return textwrap.wrap(text, width=width) if text else [""]
+    return Paragraph(escape(text), _body_style())
+
+
+def _static_paragraph(text: str) -> "Paragraph":
+    # Layout state lives on the flowable, so each document gets its own
+    # shallow copy; the parsed fragments are shared.
+    return copy.copy(_parsed_static_paragraph(text))
 
 
 def generate_takedown_pdf(apk_data: Dict[str, Any], fake_score: float) -> str:
@@ -47,7 +113,7 @@ def generate_takedown_pdf(apk_data: Dict[str, Any], fake_score: float) -> str:
         Filesystem path to the generated PDF.
     """
 
-    if REPORTLAB_IMPORT_ERROR is not None or LETTER is None or canvas is None:  # pragma: no cover
+    if REPORTLAB_IMPORT_ERROR is not None or LETTER is None or Paragraph is None:  # pragma: no cover
         raise RuntimeError(
             "reportlab is not installed. Install it with 'pip install reportlab' "
             "to enable PDF report generation."
@@ -73,31 +139,22 @@ def generate_takedown_pdf(apk_data: Dict[str, Any], fake_score: float) -> str:
     fd, pdf_path = tempfile.mkstemp(prefix="takedown_", suffix=".pdf")
     os.close(fd)
 
-    c = canvas.Canvas(pdf_path, pagesize=LETTER)
-    width, height = LETTER
+    style = _body_style()
 
-    margin_x = 72  # 1 inch
-    top_y = height - 72
+    def para(text: str) -> "Paragraph":
+        return Paragraph(escape(text), style)
 
-    text_obj = c.beginText()
-    text_obj.setTextOrigin(margin_x, top_y)
-    text_obj.setFont("Helvetica", 11)
+    # Each blank line needs its own Spacer: platypus marks a flowable it
+    # defers to the next page and fails if that same object is deferred again.
+    def blank() -> "Spacer":
+        return Spacer(1, _LEADING)
 
     # Header and recipient
-    for line in [
-        today_str,
-        "",
-        "Google Play Legal Team",
-        "Google LLC",
-        "1600 Amphitheatre Parkway",
-        "Mountain View, CA 94043",
-        "",
-        "Subject: Takedown Request for Infringing Application",
-        "",
-        "To the Google Play Legal Team:",
-        "",
-    ]:
-        text_obj.textLine(line)
+    story = [para(today_str), blank()]
+    story.extend(_static_paragraph(line) for line in _RECIPIENT_LINES)
+    story.extend(
+        [blank(), _static_paragraph(_SUBJECT), blank(), _static_paragraph(_SALUTATION), blank()]
+    )
 
     # Body paragraphs
     intro = (
@@ -116,54 +173,35 @@ def generate_takedown_pdf(apk_data: Dict[str, Any], fake_score: float) -> str:
         "attempting to impersonate our official brand."
     )
 
-    request_paragraph = (
-        "In light of this evidence, we respectfully request that Google Play "
-        "review this application and take appropriate enforcement action, "
-        "including removal from the store if your policies deem it to be "
-        "infringing or misleading. We believe prompt action is necessary to "
-        "protect users from potential confusion, fraud, or abuse."
-    )
-
-    evidence_paragraph = (
-        "For your reference, a subset of the technical indicators supporting this "
-        "request includes the following:"
-    )
-
-    closing = (
-        "Thank you for your attention to this matter and for your ongoing work "
-        "to keep the Google Play ecosystem safe for users and rights holders. "
-        "If you require any additional information or supporting documentation, "
-        "please do not hesitate to contact us."
-    )
-
-    for paragraph in [intro, "", analysis, "", request_paragraph, "", evidence_paragraph]:
-        if paragraph:
-            for line in _wrap_paragraph(paragraph):
-                text_obj.textLine(line)
-        text_obj.textLine("")
+    for paragraph in [intro, analysis]:
+        story.extend([para(paragraph), blank()])
+    for paragraph in [_REQUEST_PARAGRAPH, _EVIDENCE_PARAGRAPH]:
+        story.extend([_static_paragraph(paragraph), blank()])
 
     # Bullet-style technical summary
     bullets = [
-        f"• Package name under review: {package_name}",
-        f"• Display name observed in metadata: {app_name}",
-        f"• BrandGuard Fake Score: {score_value:.1f} / 100",
-        f"• Signing certificate hash (if available): {certificate_hash}",
+        f"Package name under review: {package_name}",
+        f"Display name observed in metadata: {app_name}",
+        f"BrandGuard Fake Score: {score_value:.1f} / 100",
+        f"Signing certificate hash (if available): {certificate_hash}",
     ]
     for bullet in bullets:
-        for line in _wrap_paragraph(bullet, width=90):
-            text_obj.textLine(line)
-    text_obj.textLine("")
+        story.append(Paragraph(escape(bullet), _bullet_style(), bulletText="•"))
+    story.append(blank())
 
     # Closing section
-    for paragraph in [closing, "", "Sincerely,", "", "BrandGuard Enforcement Team"]:
-        if paragraph:
-            for line in _wrap_paragraph(paragraph):
-                text_obj.textLine(line)
-        else:
-            text_obj.textLine("")
-
-    c.drawText(text_obj)
-    c.showPage()
-    c.save()
+    story.extend([_static_paragraph(_CLOSING), blank()])
+    story.extend([_static_paragraph(_SIGN_OFF[0]), blank(), _static_paragraph(_SIGN_OFF[1])])
+
+    margin = 72  # 1 inch
+    doc = SimpleDocTemplate(
+        pdf_path,
+        pagesize=LETTER,
+        leftMargin=margin,
+        rightMargin=margin,
+        topMargin=margin,
+        bottomMargin=margin,
+    )
+    doc.build(story)
 
     return pdf_path
@@ -1,37 +1,51 @@
 """Text similarity utilities for assessing fake vs real app names.
 
 This module exposes `calculate_text_risk`, which produces a 0-100 risk score
-based on Levenshtein distance via `thefuzz`.
+based on Levenshtein distance via `rapidfuzz` (falling back to `thefuzz`),
+and `calculate_text_risk_batch` for screening many names against a brand list.
 """
 
 from __future__ import annotations
 
-from typing import Union
-
-try:  # Import thefuzz with a clear failure mode if missing.
-    from thefuzz import fuzz
-except ImportError as exc:  # pragma: no cover - environment/config error
-    fuzz = None  # type: ignore[assignment]
-    THEFUZZ_IMPORT_ERROR = exc
+from typing import Sequence, Union
+
+try:  # Prefer rapidfuzz; thefuzz exposes the same scorer API.
+    from rapidfuzz import fuzz, process
+except ImportError:
+    process = None  # type: ignore[assignment]
+    try:
+        from thefuzz import fuzz
+    except ImportError as exc:  # pragma: no cover - environment/config error
+        fuzz = None  # type: ignore[assignment]
+        FUZZ_IMPORT_ERROR = exc
+    else:
+        FUZZ_IMPORT_ERROR = None
 else:
-    THEFUZZ_IMPORT_ERROR = None
+    FUZZ_IMPORT_ERROR = None
+
+
+# Similarity below this is treated as no textual risk. It also lets
+# rapidfuzz stop early on comparisons that cannot reach it.
+TEXT_RISK_CUTOFF = 30
 
 
 def _normalize_text(value: Union[str, None]) -> str:
-    """Normalize text inputs to safe strings for comparison."""
+    """Normalize text inputs to safe, case- and whitespace-insensitive strings."""
 
     if value is None:
         return ""
-    return str(value)
+    return str(value).casefold().strip()
 
 
 def calculate_text_risk(fake_name: Union[str, None], real_name: Union[str, None]) -> int:
     """Compute a 0-100 risk score for a fake app name vs a real name.
 
-    The score is derived from Levenshtein-based similarity via ``thefuzz.fuzz.ratio``:
+    The score is derived from Levenshtein-based similarity via ``fuzz.ratio``
+    on case-folded, stripped names:
 
     - Identical strings → 100 (highest risk: perfect imitation).
     - Completely different strings → 0 (no textual similarity).
+    - Similarity below ``TEXT_RISK_CUTOFF`` → 0.
 
     Parameters
     ----------
@@ -46,11 +60,11 @@ def calculate_text_risk(fake_name: Union[str, None], real_name: Union[str, None]
         Risk score in the range [0, 100].
     """
 
-    if THEFUZZ_IMPORT_ERROR is not None or fuzz is None:  # pragma: no cover
+    if FUZZ_IMPORT_ERROR is not None or fuzz is None:  # pragma: no cover
         raise RuntimeError(
-            "thefuzz is not installed. Install it with 'pip install thefuzz' "
+            "rapidfuzz is not installed. Install it with 'pip install rapidfuzz' "
             "to enable text similarity scoring."
-        ) from THEFUZZ_IMPORT_ERROR
+        ) from FUZZ_IMPORT_ERROR
 
     fake_normalized = _normalize_text(fake_name)
     real_normalized = _normalize_text(real_name)
@@ -59,11 +73,60 @@ def calculate_text_risk(fake_name: Union[str, None], real_name: Union[str, None]
     if not fake_normalized and not real_normalized:
         return 0
 
-    similarity = fuzz.ratio(fake_normalized, real_normalized)
+    # fuzz.ratio is at most 200 * min(len) / (sum of lens); skip the
+    # comparison entirely when even that bound is below the cutoff.
+    la, lb = len(fake_normalized), len(real_normalized)
+    if 200 * min(la, lb) < TEXT_RISK_CUTOFF * (la + lb):
+        return 0
+
+    if process is not None:  # rapidfuzz
+        similarity = fuzz.ratio(
+            fake_normalized, real_normalized, score_cutoff=TEXT_RISK_CUTOFF
+        )
+    else:
+        similarity = fuzz.ratio(fake_normalized, real_normalized)
+        if similarity < TEXT_RISK_CUTOFF:
+            similarity = 0
 
-    # fuzz.ratio already returns an integer in [0, 100], where 100 means
-    # identical strings. We interpret this directly as "risk".
-    score = int(similarity)
+    # fuzz.ratio returns a value in [0, 100], where 100 means identical
+    # strings. We interpret this directly as "risk". rapidfuzz returns a
+    # float, so round the same way thefuzz does.
+    score = int(round(similarity))
 
     # Clamp just in case a future version returns values slightly outside bounds.
     return max(0, min(100, score))
+
+
+def calculate_text_risk_batch(
+    fake_names: Sequence[Union[str, None]], real_names: Sequence[Union[str, None]]
+):
+    """Compute risk scores for every fake name against every real name.
+
+    Parameters
+    ----------
+    fake_names:
+        Candidate or fake app names.
+    real_names:
+        Legitimate brand names to screen against.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``(len(fake_names), len(real_names))`` matrix of ``fuzz.ratio``
+        scores in [0, 100], with scores below ``TEXT_RISK_CUTOFF`` set to 0.
+        Computed with ``rapidfuzz.process.cdist``, which runs outside the GIL.
+    """
+
+    if process is None:  # pragma: no cover
+        raise RuntimeError(
+            "rapidfuzz is not installed. Install it with 'pip install rapidfuzz' "
+            "to enable batch text similarity scoring."
+        ) from FUZZ_IMPORT_ERROR
+
+    return process.cdist(
+        [_normalize_text(name) for name in fake_names],
+        [_normalize_text(name) for name in real_names],
+        scorer=fuzz.ratio,
+        score_cutoff=TEXT_RISK_CUTOFF,
+        workers=-1,
+    )